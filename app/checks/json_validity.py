@@ -1,12 +1,13 @@
 import json
 from typing import Any, Dict, Optional
-from jsonschema import validate, ValidationError
 from .base import CheckOutcome
+from .registry import register_check, COST_CHEAP, COST_EXPENSIVE
 
 def check_json_validity(text: str, schema: Optional[Dict[str, Any]] = None) -> CheckOutcome:
     try:
         obj = json.loads(text)
         if schema:
+            from jsonschema import validate, ValidationError  # deferred: only schema validation needs it
             try:
                 validate(instance=obj, schema=schema)
             except ValidationError as e:
@@ -14,3 +15,13 @@ def check_json_validity(text: str, schema: Optional[Dict[str, Any]] = None) -> C
         return CheckOutcome(type="json_validity", score=1.0, passed=True, details={"parsed": True})
     except Exception as e:
         return CheckOutcome(type="json_validity", score=0.0, passed=False, details={"error": str(e)})
+
+# Parsing is cheap; schema validation is what makes this check expensive.
+@register_check(
+    "json_validity",
+    config_key="json",
+    default_enabled=False,
+    cost_fn=lambda cfg: COST_EXPENSIVE if cfg.get("schema") else COST_CHEAP,
+)
+def _json_validity(output: str, reference, cfg) -> CheckOutcome:
+    return check_json_validity(output, schema=cfg.get("schema"))
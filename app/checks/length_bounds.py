@@ -1,7 +1,12 @@
 from .base import CheckOutcome
+from .registry import register_check, COST_CHEAP
 
 def check_length_bounds(text: str, min_chars: int = 1, max_chars: int = 5000) -> CheckOutcome:
     n = len(text or "")
     passed = (n >= min_chars) and (n <= max_chars)
     score = 1.0 if passed else 0.0
     return CheckOutcome(type="length_bounds", score=score, passed=passed, details={"length": n, "min": min_chars, "max": max_chars})
+
+@register_check("length_bounds", config_key="length", cost=COST_CHEAP)
+def _length_bounds(output: str, reference, cfg) -> CheckOutcome:
+    return check_length_bounds(output, min_chars=int(cfg.get("min", 10)), max_chars=int(cfg.get("max", 3000)))
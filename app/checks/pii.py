@@ -1,5 +1,6 @@
 import re
 from .base import CheckOutcome
+from .registry import register_check, COST_CHEAP
 
 EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
 PHONE_RE = re.compile(r"(?:\+\d{1,3}[- ]?)?\b\d{10}\b")
@@ -18,3 +19,7 @@ def check_pii(text: str) -> CheckOutcome:
         passed=not any_pii,
         details={"emails": emails, "phones": phones, "cards": cards, "address_hints": address_hits},
     )
+
+@register_check("pii", cost=COST_CHEAP)
+def _pii(output: str, reference, cfg) -> CheckOutcome:
+    return check_pii(output)
@@ -1,6 +1,7 @@
 import re
 from typing import List, Dict, Any
 from .base import CheckOutcome
+from .registry import register_check, register_batch, COST_CHEAP
 
 def check_regex_policy(text: str, required: List[str] | None = None, forbidden: List[str] | None = None) -> CheckOutcome:
     required = required or []
@@ -16,3 +17,21 @@ def check_regex_policy(text: str, required: List[str] | None = None, forbidden:
     passed = (len(missing) == 0) and (len(hits) == 0)
     score = 1.0 if passed else 0.0
     return CheckOutcome(type="regex_policy", score=score, passed=passed, details={"missing": missing, "forbidden_hits": hits})
+
+@register_check("regex_policy", config_key="regex", cost=COST_CHEAP)
+def _regex_policy(output: str, reference, cfg) -> CheckOutcome:
+    return check_regex_policy(output, required=cfg.get("required", []), forbidden=cfg.get("forbidden", []))
+
+@register_batch("regex_policy")
+def _regex_policy_batch(outputs: List[str], references, cfg) -> List[CheckOutcome]:
+    # Compile the policy once for the whole chunk
+    flags = re.IGNORECASE | re.MULTILINE
+    required = [(p, re.compile(p, flags)) for p in cfg.get("required", [])]
+    forbidden = [(p, re.compile(p, flags)) for p in cfg.get("forbidden", [])]
+    outcomes = []
+    for text in outputs:
+        missing = [p for p, rx in required if not rx.search(text)]
+        hits = [p for p, rx in forbidden if rx.search(text)]
+        passed = (len(missing) == 0) and (len(hits) == 0)
+        outcomes.append(CheckOutcome(type="regex_policy", score=1.0 if passed else 0.0, passed=passed, details={"missing": missing, "forbidden_hits": hits}))
+    return outcomes
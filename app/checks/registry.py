@@ -0,0 +1,211 @@
+import asyncio
+import importlib
+import inspect
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Union
+
+from ..config import CHECK_MODULES
+from .base import CheckOutcome
+
+logger = logging.getLogger(__name__)
+
+# Relative cost tiers. Fail-fast mode skips anything at or above COST_EXPENSIVE
+# once a gating check has failed for a sample.
+COST_CHEAP = 1
+COST_MODERATE = 5
+COST_EXPENSIVE = 10
+
+# details_json marker on outcomes recorded for checks that fail-fast skipped.
+# They are stored as passed=False so baseline diffs and comparisons see them,
+# but reports leave them out of pass rates.
+SKIPPED_FAIL_FAST = "fail_fast"
+
+# Width of the check_results.type / monitor_aggregates.check_type columns
+MAX_CHECK_NAME_LEN = 50
+
+# Modules under app.checks that register built-in checks on import. Extra
+# modules listed in CHECK_MODULES are imported after these.
+BUILTIN_MODULES = ("length_bounds", "json_validity", "regex_policy", "pii", "toxicity", "similarity")
+
+CheckFn = Callable[[str, Any, Dict[str, Any]], Union[CheckOutcome, Awaitable[CheckOutcome]]]
+BatchFn = Callable[[List[str], List[Any], Dict[str, Any]], Union[List[CheckOutcome], Awaitable[List[CheckOutcome]]]]
+
+@dataclass
+class CheckSpec:
+    name: str
+    fn: CheckFn
+    config_key: str
+    cost: int = COST_CHEAP
+    is_async: bool = False
+    default_enabled: bool = True
+    cost_fn: Optional[Callable[[Dict[str, Any]], int]] = None
+    batch_fn: Optional[BatchFn] = None
+
+    @property
+    def supports_batch(self) -> bool:
+        return self.batch_fn is not None
+
+    def enabled(self, cfg: Dict[str, Any]) -> bool:
+        return bool(cfg.get("enabled", self.default_enabled))
+
+    def cost_for(self, cfg: Dict[str, Any]) -> int:
+        return self.cost_fn(cfg) if self.cost_fn else self.cost
+
+    async def run(self, output: str, reference: Any, cfg: Dict[str, Any]) -> CheckOutcome:
+        res = self.fn(output, reference, cfg)
+        if inspect.isawaitable(res):
+            res = await res
+        return res
+
+    async def run_batch(self, outputs: List[str], references: List[Any], cfg: Dict[str, Any]) -> List[CheckOutcome]:
+        if self.batch_fn is not None:
+            res = self.batch_fn(outputs, references, cfg)
+            if inspect.isawaitable(res):
+                res = await res
+            return list(res)
+        if self.is_async:
+            return list(await asyncio.gather(*(self.run(o, r, cfg) for o, r in zip(outputs, references))))
+        return [self.fn(o, r, cfg) for o, r in zip(outputs, references)]
+
+@dataclass
+class CheckPlan:
+    checks: List[tuple]  # (CheckSpec, cfg) in execution order
+    fail_fast: bool = False
+    gating: Set[str] = field(default_factory=set)
+
+@dataclass
+class PipelineResult:
+    outcomes: List[CheckOutcome] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+
+def skipped_outcome(name: str) -> CheckOutcome:
+    return CheckOutcome(type=name, score=0.0, passed=False, details={"skipped": SKIPPED_FAIL_FAST})
+
+def is_fail_fast_skip(details: Optional[Dict[str, Any]]) -> bool:
+    return (details or {}).get("skipped") == SKIPPED_FAIL_FAST
+
+_REGISTRY: Dict[str, CheckSpec] = {}
+_builtins_loaded = False
+
+def register_check(
+    name: str,
+    *,
+    config_key: Optional[str] = None,
+    cost: int = COST_CHEAP,
+    default_enabled: bool = True,
+    cost_fn: Optional[Callable[[Dict[str, Any]], int]] = None,
+):
+    """Register ``fn(output, reference, cfg)`` as a check. ``cfg`` is the project's
+    thresholds entry under ``config_key`` (defaults to ``name``)."""
+    if len(name) > MAX_CHECK_NAME_LEN:
+        raise ValueError(f"check name {name!r} is longer than {MAX_CHECK_NAME_LEN} characters")
+
+    def deco(fn: CheckFn) -> CheckFn:
+        _REGISTRY[name] = CheckSpec(
+            name=name,
+            fn=fn,
+            config_key=config_key or name,
+            cost=cost,
+            is_async=asyncio.iscoroutinefunction(fn),
+            default_enabled=default_enabled,
+            cost_fn=cost_fn,
+        )
+        return fn
+    return deco
+
+def register_batch(name: str):
+    """Attach ``fn(outputs, references, cfg) -> list[CheckOutcome]`` to a registered check."""
+    def deco(fn: BatchFn) -> BatchFn:
+        _REGISTRY[name].batch_fn = fn
+        return fn
+    return deco
+
+def ensure_builtin_checks():
+    global _builtins_loaded
+    if _builtins_loaded:
+        return
+    for mod in BUILTIN_MODULES:
+        importlib.import_module(f"{__package__}.{mod}")
+    for mod in CHECK_MODULES:
+        try:
+            importlib.import_module(mod)
+        except Exception:
+            # A broken plugin must not take the built-in checks down with it
+            logger.exception("checks: failed to import check module %s", mod)
+    _builtins_loaded = True
+
+def get_check(name: str) -> CheckSpec:
+    ensure_builtin_checks()
+    return _REGISTRY[name]
+
+def list_checks() -> List[CheckSpec]:
+    ensure_builtin_checks()
+    return list(_REGISTRY.values())
+
+def plan_checks(thresholds: Dict[str, Any], tier: Optional[str] = None) -> CheckPlan:
+    """Resolve enabled checks and their order from project thresholds.
+
+    ``tier`` restricts the plan to ``"cheap"`` (cost below COST_EXPENSIVE) or
+    ``"expensive"`` checks; None plans every enabled check.
+
+    ``thresholds["checks"]`` accepts:
+      - ``order``: ``"cost"`` (default), ``"registration"`` or an explicit list of check names
+      - ``fail_fast``: skip expensive checks once a gating check fails (default False)
+      - ``gating``: names of checks that gate; defaults to every enabled check cheaper than COST_EXPENSIVE
+    """
+    opts = thresholds.get("checks") or {}
+    selected = []
+    for spec in list_checks():
+        cfg = thresholds.get(spec.config_key) or {}
+        if not spec.enabled(cfg):
+            continue
+        expensive = spec.cost_for(cfg) >= COST_EXPENSIVE
+        if (tier == "cheap" and expensive) or (tier == "expensive" and not expensive):
+            continue
+        selected.append((spec, cfg))
+
+    order = opts.get("order", "cost")
+    if isinstance(order, list):
+        rank = {n: i for i, n in enumerate(order)}
+        selected.sort(key=lambda sc: rank.get(sc[0].name, len(rank)))
+    elif order == "cost":
+        selected.sort(key=lambda sc: sc[0].cost_for(sc[1]))
+
+    gating = opts.get("gating")
+    if gating is None:
+        gating = [spec.name for spec, cfg in selected if spec.cost_for(cfg) < COST_EXPENSIVE]
+
+    return CheckPlan(checks=selected, fail_fast=bool(opts.get("fail_fast", False)), gating=set(gating))
+
+async def run_checks_batch(
+    outputs: List[str],
+    references: List[Any],
+    thresholds: Dict[str, Any],
+    tier: Optional[str] = None,
+) -> List[PipelineResult]:
+    """Run the project's check pipeline over a chunk of outputs, one check at a time."""
+    plan = plan_checks(thresholds, tier=tier)
+    results = [PipelineResult() for _ in outputs]
+    gate_failed = [False] * len(outputs)
+
+    for spec, cfg in plan.checks:
+        expensive = spec.cost_for(cfg) >= COST_EXPENSIVE
+        idx = []
+        for i in range(len(outputs)):
+            if plan.fail_fast and expensive and gate_failed[i]:
+                results[i].skipped.append(spec.name)
+            else:
+                idx.append(i)
+        if not idx:
+            continue
+        outcomes = await spec.run_batch([outputs[i] for i in idx], [references[i] for i in idx], cfg)
+        for i, oc in zip(idx, outcomes):
+            results[i].outcomes.append(oc)
+            if spec.name in plan.gating and not oc.passed:
+                gate_failed[i] = True
+
+    return results
+
+async def run_checks(output: str, reference: Any, thresholds: Dict[str, Any], tier: Optional[str] = None) -> PipelineResult:
+    return (await run_checks_batch([output], [reference], thresholds, tier=tier))[0]
@@ -1,28 +1,42 @@
-import os
-from typing import Optional, Dict, Any
-import numpy as np
+import asyncio
+from typing import Optional, Dict, Any, List
 from .base import CheckOutcome
+from .registry import register_check, register_batch, COST_EXPENSIVE
+from ..config import OPENAI_API_KEY
 
-# Optional: OpenAI embeddings
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+# Conservative character cap for one embeddings input (the model limit is 8191 tokens)
+MAX_EMBED_CHARS = 24000
 
-async def _embed_openai(text: str) -> Optional[list[float]]:
+async def _embed_openai_many(texts: List[str]) -> Optional[list[list[float]]]:
     try:
         import httpx
         headers = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
-        payload = {"model": "text-embedding-3-small", "input": text}
+        payload = {"model": "text-embedding-3-small", "input": texts}
         async with httpx.AsyncClient(timeout=60.0) as client:
             r = await client.post("https://api.openai.com/v1/embeddings", json=payload, headers=headers)
             r.raise_for_status()
             data = r.json()
-            return data["data"][0]["embedding"]
+            return [d["embedding"] for d in sorted(data["data"], key=lambda d: d["index"])]
     except Exception:
         return None
 
-def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+async def _embed_openai(text: str) -> Optional[list[float]]:
+    embs = await _embed_openai_many([text])
+    return embs[0] if embs else None
+
+def _cosine(a, b) -> float:
+    import numpy as np  # deferred: only needed once embeddings come back
+    a, b = np.asarray(a), np.asarray(b)
     denom = (np.linalg.norm(a) * np.linalg.norm(b)) or 1e-8
     return float(np.dot(a, b) / denom)
 
+def _reference_text(reference: Any) -> Optional[str]:
+    if isinstance(reference, dict):
+        return reference.get("reference_text")
+    if isinstance(reference, str):
+        return reference
+    return None
+
 async def check_similarity(output_text: str, reference_text: Optional[str], threshold: float = 0.82) -> CheckOutcome:
     if not reference_text:
         return CheckOutcome(type="similarity", score=1.0, passed=True, details={"skipped": True, "reason": "no_reference"})
@@ -32,6 +46,55 @@ async def check_similarity(output_text: str, reference_text: Optional[str], thre
     ref_emb = await _embed_openai(reference_text)
     if not out_emb or not ref_emb:
         return CheckOutcome(type="similarity", score=0.0, passed=False, details={"error": "embedding_failed"})
-    sim = _cosine(np.array(out_emb), np.array(ref_emb))
+    sim = _cosine(out_emb, ref_emb)
     passed = sim >= threshold
     return CheckOutcome(type="similarity", score=sim, passed=passed, details={"similarity": sim, "threshold": threshold})
+
+async def check_similarity_batch(output_texts: List[str], reference_texts: List[Optional[str]], threshold: float = 0.82) -> List[CheckOutcome]:
+    """Same as check_similarity, but embeds every output and each distinct reference in a single request.
+
+    Inputs the embeddings API would reject (empty or oversized) are scored one by
+    one, and a failed batch request falls back to per-item calls, so one bad
+    sample cannot fail the whole chunk.
+    """
+    outcomes: List[Optional[CheckOutcome]] = [None] * len(output_texts)
+    todo = []
+    solo = []
+    for i, ref in enumerate(reference_texts):
+        if not ref:
+            outcomes[i] = CheckOutcome(type="similarity", score=1.0, passed=True, details={"skipped": True, "reason": "no_reference"})
+        elif not OPENAI_API_KEY:
+            outcomes[i] = CheckOutcome(type="similarity", score=0.0, passed=False, details={"error": "OPENAI_API_KEY not set"})
+        elif not output_texts[i] or len(output_texts[i]) > MAX_EMBED_CHARS or len(ref) > MAX_EMBED_CHARS:
+            solo.append(i)
+        else:
+            todo.append(i)
+    if todo:
+        # References repeat across a chunk (e.g. one test case scored for several models); embed each once
+        refs = list(dict.fromkeys(reference_texts[i] for i in todo))
+        embs = await _embed_openai_many([output_texts[i] for i in todo] + refs)
+        if embs is None:
+            solo += todo
+        else:
+            ref_embs = dict(zip(refs, embs[len(todo):]))
+            for k, i in enumerate(todo):
+                out_emb = embs[k]
+                ref_emb = ref_embs.get(reference_texts[i])
+                if not out_emb or not ref_emb:
+                    outcomes[i] = CheckOutcome(type="similarity", score=0.0, passed=False, details={"error": "embedding_failed"})
+                    continue
+                sim = _cosine(out_emb, ref_emb)
+                outcomes[i] = CheckOutcome(type="similarity", score=sim, passed=sim >= threshold, details={"similarity": sim, "threshold": threshold})
+    if solo:
+        singles = await asyncio.gather(*(check_similarity(output_texts[i], reference_texts[i], threshold=threshold) for i in solo))
+        for i, oc in zip(solo, singles):
+            outcomes[i] = oc
+    return outcomes
+
+@register_check("similarity", cost=COST_EXPENSIVE, default_enabled=False)
+async def _similarity(output: str, reference: Any, cfg: Dict[str, Any]) -> CheckOutcome:
+    return await check_similarity(output, _reference_text(reference), threshold=float(cfg.get("threshold", 0.82)))
+
+@register_batch("similarity")
+async def _similarity_batch(outputs: List[str], references: List[Any], cfg: Dict[str, Any]) -> List[CheckOutcome]:
+    return await check_similarity_batch(outputs, [_reference_text(r) for r in references], threshold=float(cfg.get("threshold", 0.82)))
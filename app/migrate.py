@@ -0,0 +1,11 @@
+"""Out-of-band schema setup: python -m app.migrate
+
+Lives outside app.database so that module is imported once under its package
+name; running it as __main__ would register the models on a second Base.
+"""
+import asyncio
+
+from .database import init_db
+
+if __name__ == "__main__":
+    asyncio.run(init_db())
@@ -2,12 +2,40 @@ import uuid
 from datetime import datetime
 from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, JSON, Float, Boolean, Text
 from sqlalchemy.orm import relationship, Mapped, mapped_column
-from pgvector.sqlalchemy import Vector
+from sqlalchemy.types import UserDefinedType
 from .database import Base
 
 def _uuid():
     return str(uuid.uuid4())
 
+class Vector(UserDefinedType):
+    """pgvector column using the extension's text format ('[1,2,3]').
+
+    Stands in for pgvector.sqlalchemy.Vector, whose import pulls in numpy.
+    """
+    cache_ok = True
+
+    def __init__(self, dim: int | None = None):
+        self.dim = dim
+
+    def get_col_spec(self, **kw):
+        return "VECTOR" if self.dim is None else f"VECTOR({self.dim})"
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if value is None:
+                return None
+            return "[" + ",".join(str(float(v)) for v in value) + "]"
+        return process
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            if value is None or not isinstance(value, str):
+                return value
+            body = value.strip()[1:-1]
+            return [float(v) for v in body.split(",")] if body else []
+        return process
+
 class Project(Base):
     __tablename__ = "projects"
     id: Mapped[str] = mapped_column(String, primary_key=True, default=_uuid)
@@ -45,6 +73,9 @@ class Run(Base):
     started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     totals_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    comparison_id: Mapped[str | None] = mapped_column(String, ForeignKey("comparisons.id"), nullable=True)
+    # Set once raw samples/check_results are dropped; aggregates live in totals_json["aggregates"]
+    compacted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     project: Mapped["Project"] = relationship(
         "Project",
@@ -53,17 +84,49 @@ class Run(Base):
     )
     samples: Mapped[list["Sample"]] = relationship("Sample", back_populates="run", cascade="all, delete-orphan")
 
+class Comparison(Base):
+    """A matrix run: one dataset pass fanned out to several inference endpoints, one Run per endpoint."""
+    __tablename__ = "comparisons"
+    id: Mapped[str] = mapped_column(String, primary_key=True, default=_uuid)
+    project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id"), nullable=False)
+    tag: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    status: Mapped[str] = mapped_column(String(40), default="queued")  # queued|running|done|failed
+    # [{label, inference_url, headers, hmac_secret, run_id}]
+    endpoints_json: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    runs: Mapped[list["Run"]] = relationship("Run", foreign_keys="Run.comparison_id")
+
+class PromptBlob(Base):
+    """Content-addressed prompt text, shared by every sample (across runs) with the same prompt."""
+    __tablename__ = "prompt_blobs"
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)  # sha256 hex
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class ReferenceBlob(Base):
+    """Content-addressed reference payload (hash of its canonical JSON)."""
+    __tablename__ = "reference_blobs"
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    body_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
 class Sample(Base):
     __tablename__ = "samples"
     id: Mapped[str] = mapped_column(String, primary_key=True, default=_uuid)
-    run_id: Mapped[str] = mapped_column(String, ForeignKey("runs.id"), nullable=False)
+    run_id: Mapped[str] = mapped_column(String, ForeignKey("runs.id"), nullable=False, index=True)
     test_id: Mapped[str] = mapped_column(String(255), nullable=False)
-    prompt: Mapped[str] = mapped_column(Text, nullable=False)
+    # prompt/reference_json are only populated on legacy rows; new rows point at blobs by hash
+    prompt: Mapped[str | None] = mapped_column(Text, nullable=True)
+    prompt_hash: Mapped[str | None] = mapped_column(String(64), ForeignKey("prompt_blobs.hash"), nullable=True)
     output: Mapped[str] = mapped_column(Text, nullable=True)
     reference_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    reference_hash: Mapped[str | None] = mapped_column(String(64), ForeignKey("reference_blobs.hash"), nullable=True)
     latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
     tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
     # Optional embedding for similarity/dedup
     embedding: Mapped[list[float] | None] = mapped_column(Vector(768), nullable=True)
 
@@ -74,9 +137,31 @@ class CheckResult(Base):
     __tablename__ = "check_results"
     id: Mapped[str] = mapped_column(String, primary_key=True, default=_uuid)
     sample_id: Mapped[str] = mapped_column(String, ForeignKey("samples.id"), nullable=False)
+    # Denormalized from the sample so reports and retention can scan one run/time range directly
+    run_id: Mapped[str | None] = mapped_column(String, ForeignKey("runs.id"), nullable=True, index=True)
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, default=datetime.utcnow, index=True)
     type: Mapped[str] = mapped_column(String(50), nullable=False)  # json_validity|regex_policy|pii|length_bounds|similarity|toxicity
     score: Mapped[float] = mapped_column(Float, default=0.0)
     passed: Mapped[bool] = mapped_column(Boolean, default=False)
     details_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
 
     sample: Mapped["Sample"] = relationship("Sample", back_populates="checks")
+
+class MonitorAggregate(Base):
+    """Hourly per-check counters for /v1/monitor/events.
+
+    Expensive checks may only run on a sample of events; each evaluation is
+    counted with weight 1/sampling_rate so weighted_passed / weighted_total is
+    an unbiased estimate of the pass rate over all traffic. Exception: with
+    checks.fail_fast on, expensive checks only cover events that passed the
+    cheap gating checks.
+    """
+    __tablename__ = "monitor_aggregates"
+    project_id: Mapped[str] = mapped_column(String, ForeignKey("projects.id"), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime, primary_key=True)  # hour start (UTC)
+    check_type: Mapped[str] = mapped_column(String(50), primary_key=True)
+    stratum: Mapped[str] = mapped_column(String(255), primary_key=True)  # "*" when unstratified
+    evaluated: Mapped[int] = mapped_column(Integer, default=0)
+    passed: Mapped[int] = mapped_column(Integer, default=0)
+    weighted_total: Mapped[float] = mapped_column(Float, default=0.0)
+    weighted_passed: Mapped[float] = mapped_column(Float, default=0.0)
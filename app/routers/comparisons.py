@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_session, SessionLocal
+from .. import models
+from .. import schemas
+
+router = APIRouter()
+
+@router.post("/v1/comparisons", response_model=schemas.ComparisonOut)
+async def start_comparison(payload: schemas.ComparisonCreate, background: BackgroundTasks, session: AsyncSession = Depends(get_session)):
+    from ..services.runner import execute_comparison
+
+    proj = await session.get(models.Project, payload.project_id)
+    if not proj:
+        raise HTTPException(status_code=404, detail="project not found")
+    labels = [ep.label for ep in payload.endpoints]
+    if len(labels) < 2:
+        raise HTTPException(status_code=400, detail="a comparison needs at least two endpoints")
+    if len(set(labels)) != len(labels):
+        raise HTTPException(status_code=400, detail="endpoint labels must be unique")
+
+    comp = models.Comparison(project_id=payload.project_id, tag=payload.dataset_tag, status="queued")
+    session.add(comp)
+    await session.flush()
+    endpoints = []
+    for ep in payload.endpoints:
+        run = models.Run(project_id=payload.project_id, tag=payload.dataset_tag, status="queued", comparison_id=comp.id)
+        session.add(run)
+        await session.flush()
+        endpoints.append({**ep.model_dump(), "run_id": run.id})
+    comp.endpoints_json = endpoints
+    await session.commit()
+
+    background.add_task(execute_comparison, SessionLocal, comp.id)
+
+    return schemas.ComparisonOut(id=comp.id, project_id=comp.project_id, status=comp.status, runs={ep["label"]: ep["run_id"] for ep in endpoints})
+
+@router.get("/v1/comparisons/{comparison_id}/report", response_model=schemas.ComparisonReportOut)
+async def get_comparison_report(comparison_id: str, session: AsyncSession = Depends(get_session)):
+    from ..services.report import build_comparison_report
+
+    try:
+        report = await build_comparison_report(session, comparison_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="comparison not found")
+    return schemas.ComparisonReportOut(**report)
@@ -0,0 +1,56 @@
+import os
+from functools import lru_cache
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import HTMLResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, cast, Integer
+
+from ..database import get_session
+from .. import models
+from ..checks.registry import SKIPPED_FAIL_FAST
+
+router = APIRouter()
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+@lru_cache(maxsize=1)
+def _templates():
+    # jinja2 is only loaded once someone opens the dashboard
+    from starlette.templating import Jinja2Templates
+
+    return Jinja2Templates(directory=TEMPLATES_DIR)
+
+@router.get("/", response_class=HTMLResponse)
+async def dashboard(request: Request, session: AsyncSession = Depends(get_session)):
+    # Stats
+    projects = (await session.execute(select(func.count(models.Project.id)))).scalar_one()
+    runs = (await session.execute(select(func.count(models.Run.id)))).scalar_one()
+    # Grab recent runs and compute quick pass rates
+    res = await session.execute(select(models.Run, models.Project).join(models.Project, models.Run.project_id == models.Project.id).order_by(models.Run.started_at.desc().nullslast()).limit(20))
+    rows = []
+    from ..models import CheckResult
+    for run, proj in res.all():
+        # pass rate for this run
+        if run.status != 'done':
+            pr = None
+        elif run.compacted_at:
+            pr = (run.totals_json or {}).get("aggregates", {}).get("pass_rate")
+        else:
+            cres = await session.execute(
+                select(
+                    func.sum(cast(CheckResult.passed, Integer)),
+                    func.count(CheckResult.id),
+                ).where(
+                    CheckResult.run_id == run.id,
+                    # leave fail-fast skips out of the pass rate
+                    func.coalesce(CheckResult.details_json["skipped"].as_string(), "") != SKIPPED_FAIL_FAST,
+                )
+            )
+            passed, total = cres.one()
+            pr = (passed or 0) / (total or 1)
+        rows.append({"run": run, "project": proj, "pass_rate": pr})
+    # avg of recent pass rates (ignore None)
+    pr_values = [r["pass_rate"] for r in rows if r["pass_rate"] is not None]
+    avg_pass = sum(pr_values)/len(pr_values) if pr_values else None
+    stats = {"projects": projects, "runs": runs, "avg_pass": avg_pass}
+    return _templates().TemplateResponse("dashboard.html", {"request": request, "runs": rows, "stats": stats})
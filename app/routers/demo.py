@@ -0,0 +1,34 @@
+# --- Demo endpoints ---
+from fastapi import APIRouter
+from pydantic import BaseModel
+
+router = APIRouter()
+
+class DemoInferIn(BaseModel):
+    id: str
+    prompt: str
+    metadata: dict | None = None
+
+@router.get("/demo/tests")
+async def demo_tests():
+    return [
+        {"id": "t-001", "prompt": "Explain our refund policy in 2 sentences.", "reference": {"reference_text": "Refunds within 30 days with proof of purchase."}},
+        {"id": "t-002", "prompt": "Summarize the privacy policy; include a citation.", "reference": {"reference_text": "We do not sell personal data; users can request deletion."}},
+        {"id": "t-003", "prompt": "Return a JSON object with keys: status, eta_days.", "reference": {"reference_text": "{""status"": ""ok"", ""eta_days"": 5}"}},
+    ]
+
+@router.post("/demo/infer")
+async def demo_infer(body: DemoInferIn):
+    import time
+    start = time.time()
+    p = body.prompt.lower()
+    # Very naive generation for demo purposes
+    if "json" in p:
+        output = '{"status":"ok","eta_days":5}'
+    elif "citation" in p or "cite" in p:
+        output = "According to our policy (https://example.com/policy), we process data responsibly."
+    else:
+        output = "We offer refunds within 30 days if you have proof of purchase. Contact support for assistance."
+    latency_ms = int((time.time() - start) * 1000) + 50
+    tokens = max(10, len(output.split()))
+    return {"output": output, "latency_ms": latency_ms, "tokens": tokens}
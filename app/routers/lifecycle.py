@@ -0,0 +1,13 @@
+from fastapi import APIRouter, BackgroundTasks
+
+from ..database import SessionLocal
+
+router = APIRouter()
+
+@router.post("/v1/lifecycle/retention")
+async def run_retention(background: BackgroundTasks):
+    # Compacts runs past each project's retention window; see app/services/lifecycle.py
+    from ..services.lifecycle import apply_retention
+
+    background.add_task(apply_retention, SessionLocal)
+    return {"ok": True, "queued": True}
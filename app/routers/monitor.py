@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_session
+from .. import models
+from .. import schemas
+
+router = APIRouter()
+
+# Monitoring endpoint: cheap checks on every event, expensive checks per the project's
+# sampling policy (thresholds.sampling). Only weighted aggregates are persisted.
+@router.post("/v1/monitor/events")
+async def monitor_event(payload: schemas.MonitorEvent, session: AsyncSession = Depends(get_session)):
+    from ..services.monitoring import evaluate_event
+
+    proj = await session.get(models.Project, payload.project_id)
+    if not proj:
+        raise HTTPException(status_code=404, detail="project not found")
+    return await evaluate_event(session, proj, payload.output, payload.metadata, reference=payload.reference)
+
+@router.get("/v1/projects/{project_id}/monitor/stats")
+async def get_monitor_stats(project_id: str, hours: int = 24, session: AsyncSession = Depends(get_session)):
+    from ..services.monitoring import monitor_stats
+
+    proj = await session.get(models.Project, project_id)
+    if not proj:
+        raise HTTPException(status_code=404, detail="project not found")
+    return await monitor_stats(session, proj, hours=hours)
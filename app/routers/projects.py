@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_session
+from .. import models
+from .. import schemas
+
+router = APIRouter()
+
+@router.post("/v1/projects", response_model=schemas.ProjectOut)
+async def create_project(payload: schemas.ProjectCreate, session: AsyncSession = Depends(get_session)):
+    proj = models.Project(
+        name=payload.name,
+        dataset_url=payload.dataset_url,
+        inference_url=payload.inference_url,
+        headers_json=payload.headers,
+        hmac_secret=payload.hmac_secret,
+        thresholds_json=payload.thresholds,
+    )
+    session.add(proj)
+    await session.commit()
+    return schemas.ProjectOut(id=proj.id, name=proj.name, dataset_url=proj.dataset_url, inference_url=proj.inference_url, baseline_run_id=proj.baseline_run_id)
+
+@router.post("/v1/projects/{project_id}/baseline")
+async def set_baseline(project_id: str, payload: schemas.BaselineSet, session: AsyncSession = Depends(get_session)):
+    # Row lock serializes with retention, which re-checks the baseline under the same lock
+    proj = await session.get(models.Project, project_id, with_for_update=True)
+    if not proj:
+        raise HTTPException(status_code=404, detail="project not found")
+    run = await session.get(models.Run, payload.run_id, populate_existing=True)
+    if not run or run.project_id != project_id:
+        raise HTTPException(status_code=400, detail="invalid run for this project")
+    if run.compacted_at:
+        raise HTTPException(status_code=400, detail="run has been compacted and cannot be a baseline")
+    proj.baseline_run_id = run.id
+    await session.commit()
+    return {"ok": True, "project_id": project_id, "baseline_run_id": run.id}
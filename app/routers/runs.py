@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import get_session, SessionLocal
+from .. import models
+from .. import schemas
+
+router = APIRouter()
+
+@router.post("/v1/runs", response_model=schemas.RunOut)
+async def start_run(payload: schemas.RunCreate, background: BackgroundTasks, session: AsyncSession = Depends(get_session)):
+    # Services (httpx, check modules) load on first use, not at boot
+    from ..services.runner import execute_run
+
+    # Ensure project exists
+    proj = await session.get(models.Project, payload.project_id)
+    if not proj:
+        raise HTTPException(status_code=404, detail="project not found")
+
+    run = models.Run(project_id=payload.project_id, tag=payload.dataset_tag or payload.tag, status="queued")
+    session.add(run)
+    await session.commit()
+
+    # Launch background execution with a fresh session factory
+    background.add_task(execute_run, SessionLocal, run.id)
+
+    return schemas.RunOut(id=run.id, project_id=run.project_id, tag=run.tag, status=run.status)
+
+@router.get("/v1/runs/{run_id}/report", response_model=schemas.ReportOut)
+async def get_report(run_id: str, session: AsyncSession = Depends(get_session)):
+    from ..services.report import build_report
+
+    report = await build_report(session, run_id)
+    return schemas.ReportOut(**report)
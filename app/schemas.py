@@ -36,6 +36,7 @@ class MonitorEvent(BaseModel):
     project_id: str
     prompt: str
     output: str
+    reference: Optional[Any] = None  # str or {"reference_text": ...}; enables similarity
     metadata: Optional[Dict[str, Any]] = None
 
 class ReportOut(BaseModel):
@@ -46,3 +47,28 @@ class ReportOut(BaseModel):
     by_check: Dict[str, Any]
     failures: List[Dict[str, Any]]
     baseline_diff: Optional[Dict[str, Any]] = None
+    compacted: bool = False
+
+class ComparisonEndpoint(BaseModel):
+    label: str
+    inference_url: str
+    headers: Optional[Dict[str, str]] = None  # defaults to the project's headers
+    hmac_secret: Optional[str] = None  # defaults to the project's secret
+
+class ComparisonCreate(BaseModel):
+    project_id: str
+    endpoints: List[ComparisonEndpoint]
+    dataset_tag: Optional[str] = None
+
+class ComparisonOut(BaseModel):
+    id: str
+    project_id: str
+    status: str
+    runs: Dict[str, str]  # label -> run_id
+
+class ComparisonReportOut(BaseModel):
+    comparison_id: str
+    project_id: str
+    status: str
+    runs: List[Dict[str, Any]]
+    win_loss: Dict[str, Any]
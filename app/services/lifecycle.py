@@ -0,0 +1,173 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, delete, exists, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import RETENTION_RAW_DAYS, RETENTION_ARCHIVE_DIR
+from ..models import Project, Run, Sample, CheckResult, PromptBlob, ReferenceBlob
+from .report import aggregate_run
+
+logger = logging.getLogger(__name__)
+
+# --- Content-addressed prompts/references ---
+
+# Advisory lock key guarding blobs. Writers hold it shared until their transaction
+# ends, so orphan collection (exclusive) never sees a blob whose samples are not
+# yet flushed or committed.
+BLOB_LOCK_KEY = 0x5E17B10B
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def content_hash(value: Any) -> str:
+    # Always canonical JSON, so the string '{"a":1}' and the dict {"a": 1} differ.
+    # The prefix keeps these hashes apart from rows written under the old raw-string scheme.
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(b"json:" + raw).hexdigest()
+
+async def _intern(session: AsyncSession, model, h: str, **values) -> str:
+    # Once per transaction: take the shared blob lock and reset the cache of
+    # what this transaction already wrote (skips repeat round-trips within a run)
+    tx = session.sync_session.get_transaction()
+    if tx is None or session.info.get("blob_tx") is not tx:
+        await session.execute(text("SELECT pg_advisory_xact_lock_shared(:k)"), {"k": BLOB_LOCK_KEY})
+        session.info["blob_tx"] = session.sync_session.get_transaction()
+        session.info["interned"] = set()
+    seen = session.info["interned"]
+    if (model.__tablename__, h) not in seen:
+        await session.execute(pg_insert(model).values(hash=h, **values).on_conflict_do_nothing(index_elements=["hash"]))
+        seen.add((model.__tablename__, h))
+    return h
+
+async def intern_prompt(session: AsyncSession, prompt: str) -> str:
+    return await _intern(session, PromptBlob, text_hash(prompt), text=prompt)
+
+async def intern_reference(session: AsyncSession, reference: Any) -> Optional[str]:
+    if reference is None:
+        return None
+    return await _intern(session, ReferenceBlob, content_hash(reference), body_json=reference)
+
+# --- Retention / compaction ---
+
+def _policy(project: Project) -> Dict[str, Any]:
+    cfg = (project.thresholds_json or {}).get("retention") or {}
+    return {
+        "raw_days": int(cfg.get("raw_days", RETENTION_RAW_DAYS)),
+        "archive": bool(cfg.get("archive", bool(RETENTION_ARCHIVE_DIR))) and bool(RETENTION_ARCHIVE_DIR),
+    }
+
+async def _archive_run(session: AsyncSession, run: Run) -> str:
+    res = await session.execute(
+        select(Sample, PromptBlob.text, ReferenceBlob.body_json)
+        .outerjoin(PromptBlob, PromptBlob.hash == Sample.prompt_hash)
+        .outerjoin(ReferenceBlob, ReferenceBlob.hash == Sample.reference_hash)
+        .where(Sample.run_id == run.id)
+    )
+    rows = res.all()
+    checks = (await session.execute(select(CheckResult).where(CheckResult.run_id == run.id))).scalars().all()
+    by_sample: Dict[str, List[Dict[str, Any]]] = {}
+    for c in checks:
+        by_sample.setdefault(c.sample_id, []).append({"type": c.type, "score": c.score, "passed": c.passed, "details": c.details_json})
+
+    lines = []
+    for s, prompt, reference in rows:
+        lines.append(json.dumps({
+            "sample_id": s.id,
+            "test_id": s.test_id,
+            "prompt": prompt if prompt is not None else s.prompt,
+            "reference": reference if reference is not None else s.reference_json,
+            "output": s.output,
+            "latency_ms": s.latency_ms,
+            "tokens": s.tokens,
+            "created_at": s.created_at.isoformat() if s.created_at else None,
+            "checks": by_sample.get(s.id, []),
+        }))
+
+    path = os.path.join(RETENTION_ARCHIVE_DIR, run.project_id, f"{run.id}.jsonl.gz")
+
+    def _write():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line + "\n")
+
+    await asyncio.to_thread(_write)
+    return path
+
+async def compact_run(session: AsyncSession, run: Run, archive: bool = False) -> Dict[str, Any]:
+    """Replace a run's raw samples/check_results with its aggregates. Caller commits."""
+    agg, _ = await aggregate_run(session, run.id)
+    archive_path = await _archive_run(session, run) if archive else None
+
+    await session.execute(delete(CheckResult).where(CheckResult.run_id == run.id))
+    await session.execute(delete(Sample).where(Sample.run_id == run.id))
+
+    run.totals_json = {**(run.totals_json or {}), "aggregates": agg, "archive_path": archive_path}
+    run.compacted_at = datetime.utcnow()
+    return {"run_id": run.id, "archive_path": archive_path}
+
+async def _collect_orphan_blobs(session: AsyncSession) -> Optional[int]:
+    """Delete blobs no sample references. Returns None (and does nothing) while
+    any run holds the shared blob lock."""
+    got = (await session.execute(text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": BLOB_LOCK_KEY})).scalar_one()
+    if not got:
+        return None
+    removed = 0
+    for model, col in ((PromptBlob, Sample.prompt_hash), (ReferenceBlob, Sample.reference_hash)):
+        res = await session.execute(delete(model).where(~exists().where(col == model.hash)))
+        removed += res.rowcount or 0
+    return removed
+
+async def apply_retention(session_factory, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Compact every finished run older than its project's raw_days window.
+
+    Pinned baselines are never compacted.
+    """
+    now = now or datetime.utcnow()
+    compacted: List[Dict[str, Any]] = []
+    async with session_factory() as session:  # type: AsyncSession
+        projects = (await session.execute(select(Project))).scalars().all()
+        for project in projects:
+            policy = _policy(project)
+            if policy["raw_days"] <= 0:
+                continue
+            cutoff = now - timedelta(days=policy["raw_days"])
+            res = await session.execute(
+                select(Run).where(
+                    Run.project_id == project.id,
+                    Run.status.in_(["done", "failed"]),
+                    Run.compacted_at.is_(None),
+                    func.coalesce(Run.finished_at, Run.started_at) < cutoff,
+                )
+            )
+            for run in res.scalars().all():
+                # Re-read the baseline under a row lock in the compacting transaction;
+                # set_baseline takes the same lock, so a run pinned meanwhile is skipped
+                locked = await session.get(Project, project.id, with_for_update=True, populate_existing=True)
+                await session.refresh(run)
+                if locked.baseline_run_id != run.id and run.compacted_at is None:
+                    compacted.append(await compact_run(session, run, archive=policy["archive"]))
+                await session.commit()
+
+        blobs_removed = await _collect_orphan_blobs(session)
+        await session.commit()
+
+    if blobs_removed is None:
+        logger.info("retention: compacted %d runs, skipped blob collection (runs in progress)", len(compacted))
+    else:
+        logger.info("retention: compacted %d runs, removed %d orphan blobs", len(compacted), blobs_removed)
+    return {"compacted": compacted, "blobs_removed": blobs_removed}
+
+if __name__ == "__main__":
+    # Cron-friendly entry point: python -m app.services.lifecycle
+    from ..database import SessionLocal
+
+    print(json.dumps(asyncio.run(apply_retention(SessionLocal)), indent=2))
@@ -0,0 +1,324 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Project, MonitorAggregate
+from ..checks.base import CheckOutcome
+from ..checks.registry import run_checks, plan_checks
+from .runner import resolve_thresholds
+
+logger = logging.getLogger(__name__)
+
+# thresholds["sampling"] defaults. rate=1.0 evaluates expensive checks on every event.
+DEFAULT_SAMPLING: Dict[str, Any] = {
+    "mode": "rate",  # rate|budget
+    "rate": 1.0,
+    "budget": 100,  # target expensive evaluations per stratum per window (budget mode)
+    "window_seconds": 3600,
+    "strata": [],  # metadata keys to stratify by
+    "stratum_rates": {},  # {"model=gpt-4o": 0.5}; overrides rate for that stratum
+    "boost_rate": 1.0,  # rate used when a cheap check failed; null disables boosting
+}
+
+# Bounds on per-process sampler state and on stored aggregate keys
+MAX_TRACKED_STRATA = 10_000
+MAX_STRATUM_LEN = 255  # MonitorAggregate.stratum column width
+MAX_CHECK_TYPE_LEN = 50  # MonitorAggregate.check_type column width
+
+# Aggregate counters are buffered in-process and upserted at most this often,
+# so concurrent events don't queue on the same monitor_aggregates row locks.
+FLUSH_SECONDS = 5.0
+# Consecutive failed flushes before counters that still fail are dropped, and
+# the most distinct keys the buffer holds (new keys beyond that are dropped)
+MAX_FLUSH_RETRIES = 3
+MAX_PENDING_KEYS = 100_000
+
+@dataclass
+class SamplingDecision:
+    stratum: str
+    rate: float
+    sampled: bool
+
+def _clip(value: str, limit: int) -> str:
+    if len(value) <= limit:
+        return value
+    # Keep a readable prefix; the hash keeps distinct long values apart
+    return value[:limit - 17] + "#" + hashlib.sha256(value.encode()).hexdigest()[:16]
+
+def stratum_key(keys: List[str], metadata: Optional[Dict[str, Any]]) -> str:
+    meta = metadata or {}
+    return _clip(",".join(f"{k}={meta.get(k)}" for k in keys) or "*", MAX_STRATUM_LEN)
+
+class MonitorSampler:
+    """Decides per event whether the expensive check tier runs.
+
+    Budget mode sets the rate from traffic volume so that about ``budget``
+    events per stratum get expensive checks each window: the n-th event of the
+    current window is evaluated with probability min(1, budget / max(n, N_prev)),
+    where N_prev is the previous window's event count. With steady traffic that
+    is ~budget evaluations per window. The first window of a stratum, and a
+    window whose traffic surges past the previous one, can overshoot up to about
+    budget * (1 + ln(n / budget)). Each event's probability is known when it is
+    decided, so the 1/rate weights stay unbiased.
+
+    Counters are per process and kept for at most MAX_TRACKED_STRATA strata
+    (least recently seen are dropped).
+    """
+
+    def __init__(self):
+        # (project_id, stratum) -> (window_start, n_current, n_previous)
+        self._seen: "OrderedDict[Tuple[str, str], Tuple[float, int, int]]" = OrderedDict()
+
+    def _budget_rate(self, key: Tuple[str, str], budget: int, window: int, now: float) -> float:
+        start, n, prev = self._seen.pop(key, (now, 0, 0))
+        if now - start >= window:
+            # A gap longer than one window means the previous window saw no traffic
+            prev = n if now - start < 2 * window else 0
+            start, n = now, 0
+        n += 1
+        self._seen[key] = (start, n, prev)
+        while len(self._seen) > MAX_TRACKED_STRATA:
+            self._seen.popitem(last=False)
+        return min(1.0, budget / max(n, prev, 1))
+
+    def decide(self, project_id: str, policy: Dict[str, Any], metadata: Optional[Dict[str, Any]], cheap_failed: bool) -> SamplingDecision:
+        stratum = stratum_key(policy.get("strata") or [], metadata)
+
+        if policy.get("mode") == "budget":
+            rate = self._budget_rate(
+                (project_id, stratum),
+                int(policy.get("budget", 100)),
+                int(policy.get("window_seconds", 3600)),
+                datetime.utcnow().timestamp(),
+            )
+        else:
+            rate = float((policy.get("stratum_rates") or {}).get(stratum, policy.get("rate", 1.0)))
+
+        boost = policy.get("boost_rate")
+        if cheap_failed and boost is not None:
+            rate = max(rate, float(boost))
+        rate = min(max(rate, 0.0), 1.0)
+        return SamplingDecision(stratum=stratum, rate=rate, sampled=rate > 0 and random.random() < rate)
+
+sampler = MonitorSampler()
+
+def resolve_sampling(thresholds: Dict[str, Any]) -> Dict[str, Any]:
+    return {**DEFAULT_SAMPLING, **(thresholds.get("sampling") or {})}
+
+async def evaluate_event(
+    session: AsyncSession,
+    project: Project,
+    output: str,
+    metadata: Optional[Dict[str, Any]],
+    reference: Any = None,
+) -> Dict[str, Any]:
+    """Score one production event: cheap checks always, expensive checks on a sample.
+
+    With checks.fail_fast on, expensive checks never run on events that failed a
+    cheap gating check, so their aggregates describe only events that passed the
+    cheap tier (reported as ``conditional_on_cheap_pass`` by monitor_stats).
+    """
+    thresholds = resolve_thresholds(project)
+    policy = resolve_sampling(thresholds)
+
+    cheap = await run_checks(output, reference, thresholds, tier="cheap")
+    gating = plan_checks(thresholds, tier="cheap").gating
+    cheap_failed = any(not oc.passed for oc in cheap.outcomes if oc.type in gating)
+
+    decision = sampler.decide(project.id, policy, metadata, cheap_failed)
+    weighted: List[Tuple[CheckOutcome, float]] = [(oc, 1.0) for oc in cheap.outcomes]
+    skipped: List[str] = []
+    expensive_names = [spec.name for spec, _ in plan_checks(thresholds, tier="expensive").checks]
+    fail_fast = bool((thresholds.get("checks") or {}).get("fail_fast", False))
+    if fail_fast and cheap_failed:
+        skipped = expensive_names
+    elif decision.sampled:
+        expensive = await run_checks(output, reference, thresholds, tier="expensive")
+        weighted += [(oc, 1.0 / decision.rate) for oc in expensive.outcomes]
+    else:
+        skipped = expensive_names
+
+    # Outcomes that did not actually evaluate (e.g. similarity without a reference) stay out of the rates
+    scored = [(oc, w) for oc, w in weighted if not (oc.details or {}).get("skipped")]
+    aggregates.add(project.id, decision.stratum, scored)
+    await aggregates.flush(session)
+
+    return {
+        "checks": [oc.__dict__ for oc, _ in weighted],
+        "skipped": skipped,
+        "sampling": {"stratum": decision.stratum, "rate": decision.rate, "sampled": decision.sampled},
+    }
+
+AggKey = Tuple[str, datetime, str, str]  # (project_id, bucket, check_type, stratum)
+
+class AggregateBuffer:
+    """In-process accumulator for monitor_aggregates.
+
+    Events add to local counters; ``flush`` writes them in one upsert per
+    interval. Each process flushes its own counters, and up to FLUSH_SECONDS of
+    counts are lost if a process dies before flushing.
+
+    When the batch upsert fails, rows are retried one by one so a bad key can't
+    block the others. Rows still failing after MAX_FLUSH_RETRIES consecutive
+    failed flushes are dropped.
+    """
+
+    def __init__(self):
+        self._pending: Dict[AggKey, List[float]] = {}
+        self._lock = asyncio.Lock()
+        self._last_flush = time.monotonic()
+        self._failures = 0
+        self._dropped = 0
+
+    def add(self, project_id: str, stratum: str, weighted: List[Tuple[CheckOutcome, float]]):
+        bucket = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        for oc, w in weighted:
+            key = (project_id, bucket, _clip(oc.type, MAX_CHECK_TYPE_LEN), stratum)
+            self._merge(key, [1, 1 if oc.passed else 0, w, w if oc.passed else 0.0])
+
+    def _merge(self, key: AggKey, counts: List[float]):
+        acc = self._pending.get(key)
+        if acc is None:
+            if len(self._pending) >= MAX_PENDING_KEYS:
+                self._dropped += 1
+                return
+            acc = self._pending[key] = [0, 0, 0.0, 0.0]
+        for i, v in enumerate(counts):
+            acc[i] += v
+
+    async def flush(self, session: AsyncSession, force: bool = False):
+        if not force and time.monotonic() - self._last_flush < FLUSH_SECONDS:
+            return
+        async with self._lock:
+            # Swap before awaiting so events arriving mid-flush go to the next batch
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            if self._dropped:
+                logger.warning("monitor: aggregate buffer full, dropped %d counters", self._dropped)
+                self._dropped = 0
+            if not pending:
+                return
+            try:
+                await _upsert_aggregates(session, pending)
+                await session.commit()
+                self._failures = 0
+                return
+            except Exception:
+                await session.rollback()
+                logger.exception("monitor: aggregate flush failed, retrying %d counters one by one", len(pending))
+
+            failed = await _upsert_each(session, pending)
+            if not failed:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures > MAX_FLUSH_RETRIES:
+                logger.error("monitor: dropping %d aggregate counters after %d failed flushes", len(failed), self._failures)
+                self._failures = 0
+                return
+            for key, counts in failed.items():
+                self._merge(key, counts)
+
+aggregates = AggregateBuffer()
+
+async def _upsert_each(session: AsyncSession, pending: Dict[AggKey, List[float]]) -> Dict[AggKey, List[float]]:
+    """Upsert rows one per savepoint and commit those that succeed; returns the rest."""
+    failed: Dict[AggKey, List[float]] = {}
+    try:
+        for n, (key, counts) in enumerate(sorted(pending.items()), 1):
+            try:
+                async with session.begin_nested():
+                    await _upsert_aggregates(session, {key: counts})
+            except Exception:
+                failed[key] = counts
+                if n == len(failed) >= 10:
+                    # Nothing has gone through: the database is down, not a bad row
+                    return pending
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        return pending
+    return failed
+
+async def _upsert_aggregates(session: AsyncSession, pending: Dict[AggKey, List[float]]):
+    # Sorted so concurrent flushes from several processes lock rows in the same order
+    rows = [
+        {
+            "project_id": project_id,
+            "bucket": bucket,
+            "check_type": check_type,
+            "stratum": stratum,
+            "evaluated": int(evaluated),
+            "passed": int(passed),
+            "weighted_total": weighted_total,
+            "weighted_passed": weighted_passed,
+        }
+        for (project_id, bucket, check_type, stratum), (evaluated, passed, weighted_total, weighted_passed) in sorted(pending.items())
+    ]
+    stmt = pg_insert(MonitorAggregate).values(rows)
+    t = MonitorAggregate.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["project_id", "bucket", "check_type", "stratum"],
+        set_={
+            "evaluated": t.evaluated + stmt.excluded.evaluated,
+            "passed": t.passed + stmt.excluded.passed,
+            "weighted_total": t.weighted_total + stmt.excluded.weighted_total,
+            "weighted_passed": t.weighted_passed + stmt.excluded.weighted_passed,
+        },
+    )
+    await session.execute(stmt)
+
+async def monitor_stats(session: AsyncSession, project: Project, hours: int = 24) -> Dict[str, Any]:
+    """Weighted pass-rate estimates per check (and per stratum) over the last ``hours``."""
+    project_id = project.id
+    thresholds = resolve_thresholds(project)
+    fail_fast = bool((thresholds.get("checks") or {}).get("fail_fast", False))
+    expensive = {spec.name for spec, _ in plan_checks(thresholds, tier="expensive").checks}
+    # Include this process's buffered counters; other processes flush on their own interval
+    await aggregates.flush(session, force=True)
+    since = datetime.utcnow() - timedelta(hours=hours)
+    res = await session.execute(
+        select(MonitorAggregate).where(MonitorAggregate.project_id == project_id, MonitorAggregate.bucket >= since)
+    )
+    def _zero():
+        return {"evaluated": 0, "passed": 0, "weighted_total": 0.0, "weighted_passed": 0.0}
+
+    by_check = defaultdict(_zero)
+    by_stratum = defaultdict(lambda: defaultdict(_zero))
+    for a in res.scalars().all():
+        for acc in (by_check[a.check_type], by_stratum[a.check_type][a.stratum]):
+            acc["evaluated"] += a.evaluated
+            acc["passed"] += a.passed
+            acc["weighted_total"] += a.weighted_total
+            acc["weighted_passed"] += a.weighted_passed
+
+    def _rates(acc):
+        return {
+            **acc,
+            "est_events": acc["weighted_total"],
+            "pass_rate": (acc["weighted_passed"] / acc["weighted_total"]) if acc["weighted_total"] else None,
+        }
+
+    return {
+        "project_id": project_id,
+        "since": since.isoformat(),
+        "by_check": {
+            k: {
+                **_rates(v),
+                # fail-fast never evaluates expensive checks on events that failed the cheap tier
+                "conditional_on_cheap_pass": fail_fast and k in expensive,
+                "strata": {s: _rates(sv) for s, sv in by_stratum[k].items()},
+            }
+            for k, v in by_check.items()
+        },
+    }
@@ -1,8 +1,9 @@
 from collections import defaultdict
 from typing import Dict, Any, List
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..models import Run, Sample, CheckResult, Project
+from ..models import Run, Sample, CheckResult, Project, Comparison
+from ..checks.registry import is_fail_fast_skip
 
 async def build_report(session: AsyncSession, run_id: str) -> Dict[str, Any]:
     run = await session.get(Run, run_id)
@@ -10,12 +11,47 @@ async def build_report(session: AsyncSession, run_id: str) -> Dict[str, Any]:
         raise ValueError("Run not found")
     proj = await session.get(Project, run.project_id)
 
-    res_samples = await session.execute(select(Sample).where(Sample.run_id == run_id))
-    samples = res_samples.scalars().all()
-    sample_ids = [s.id for s in samples]
+    if run.compacted_at:
+        # Raw rows are gone; serve the aggregates captured at compaction time
+        agg = (run.totals_json or {}).get("aggregates", {})
+        return {
+            "run_id": run_id,
+            "project_id": run.project_id,
+            "pass_rate": agg.get("pass_rate", 0.0),
+            "totals": agg.get("totals", {}),
+            "by_check": agg.get("by_check", {}),
+            "failures": [],
+            "baseline_diff": None,
+            "compacted": True,
+        }
 
-    res_checks = await session.execute(select(CheckResult).where(CheckResult.sample_id.in_(sample_ids)))
-    checks = res_checks.scalars().all()
+    agg, failures = await aggregate_run(session, run_id)
+
+    baseline_diff = None
+    if proj and proj.baseline_run_id and proj.baseline_run_id != run_id:
+        baseline_diff = await diff_against_baseline(session, baseline_run_id=proj.baseline_run_id, current_run_id=run_id)
+
+    return {
+        "run_id": run_id,
+        "project_id": run.project_id,
+        "pass_rate": agg["pass_rate"],
+        "totals": agg["totals"],
+        "by_check": agg["by_check"],
+        "failures": failures[:200],  # cap
+        "baseline_diff": baseline_diff,
+    }
+
+async def aggregate_run(session: AsyncSession, run_id: str) -> tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Pass rates for one run from its raw rows. Returns (aggregates, failures)."""
+    sample_count = (await session.execute(select(func.count(Sample.id)).where(Sample.run_id == run_id))).scalar_one()
+    res_checks = await session.execute(select(CheckResult).where(CheckResult.run_id == run_id))
+    rows = res_checks.scalars().all()
+    # Checks skipped by fail-fast are counted separately, not as failures
+    checks = [c for c in rows if not is_fail_fast_skip(c.details_json)]
+    skipped = defaultdict(int)
+    for c in rows:
+        if is_fail_fast_skip(c.details_json):
+            skipped[c.type] += 1
 
     total_checks = len(checks) or 1
     passed_checks = sum(1 for c in checks if c.passed)
@@ -36,22 +72,14 @@ async def build_report(session: AsyncSession, run_id: str) -> Dict[str, Any]:
                 "details": c.details_json,
             })
 
-    by_check_rates = {k: {"pass_rate": (v["passed"] / v["total"]) if v["total"] else 0.0, "total": v["total"]} for k, v in by_check.items()}
-    totals = {"samples": len(samples), "checks": total_checks, "passed": passed_checks}
-
-    baseline_diff = None
-    if proj and proj.baseline_run_id and proj.baseline_run_id != run_id:
-        baseline_diff = await diff_against_baseline(session, baseline_run_id=proj.baseline_run_id, current_run_id=run_id)
-
-    return {
-        "run_id": run_id,
-        "project_id": run.project_id,
-        "pass_rate": pass_rate,
-        "totals": totals,
-        "by_check": by_check_rates,
-        "failures": failures[:200],  # cap
-        "baseline_diff": baseline_diff,
+    by_check_rates = {
+        k: {"pass_rate": (v["passed"] / v["total"]) if v["total"] else 0.0, "total": v["total"], "skipped": skipped.get(k, 0)}
+        for k, v in by_check.items()
     }
+    for k, n in skipped.items():
+        by_check_rates.setdefault(k, {"pass_rate": 0.0, "total": 0, "skipped": n})
+    totals = {"samples": sample_count, "checks": total_checks, "passed": passed_checks, "skipped": sum(skipped.values())}
+    return {"pass_rate": pass_rate, "totals": totals, "by_check": by_check_rates}, failures
 
 async def diff_against_baseline(session: AsyncSession, baseline_run_id: str, current_run_id: str) -> Dict[str, Any]:
     # Compare pass/fail per (test_id, check_type)
@@ -82,19 +110,31 @@ async def diff_against_baseline(session: AsyncSession, baseline_run_id: str, cur
     # but reverse lookup above is expensive; better: build sample_id->test_id map
     sid_to_tid_b = {s.id: s.test_id for s in bs_samples}
     sid_to_tid_c = {s.id: s.test_id for s in csamples}
+    # Fail-fast skips are stored as passed=False; a skip on either side means the
+    # check never ran there, so the pair is counted as not comparable instead.
+    # (The gating failure behind a skip shows up as its own regression.)
+    skipped = set()
     b_by_test = defaultdict(dict)
     for c in bchecks:
         b_by_test[sid_to_tid_b[c.sample_id]][c.type] = c.passed
+        if is_fail_fast_skip(c.details_json):
+            skipped.add((sid_to_tid_b[c.sample_id], c.type))
     c_by_test = defaultdict(dict)
     for c in cchecks:
         c_by_test[sid_to_tid_c[c.sample_id]][c.type] = c.passed
+        if is_fail_fast_skip(c.details_json):
+            skipped.add((sid_to_tid_c[c.sample_id], c.type))
 
+    not_comparable = 0
     for tid, btypes in b_by_test.items():
         if tid not in c_by_test:
             continue
         for t, bpass in btypes.items():
             if t not in c_by_test[tid]:
                 continue
+            if (tid, t) in skipped:
+                not_comparable += 1
+                continue
             cpass = c_by_test[tid][t]
             if bpass and not cpass:
                 regressions += 1
@@ -103,4 +143,94 @@ async def diff_against_baseline(session: AsyncSession, baseline_run_id: str, cur
                 improvements += 1
                 pairs.append({"test_id": tid, "check": t, "from": False, "to": True})
 
-    return {"regressions": regressions, "improvements": improvements, "examples": pairs[:200]}
+    return {
+        "regressions": regressions,
+        "improvements": improvements,
+        "not_comparable": not_comparable,
+        "examples": pairs[:200],
+    }
+
+async def build_comparison_report(session: AsyncSession, comparison_id: str) -> Dict[str, Any]:
+    """N-way report for a matrix run: per-run pass rates plus, for every check,
+    a pairwise win/loss table aligned by test_id."""
+    comp = await session.get(Comparison, comparison_id)
+    if not comp:
+        raise ValueError("Comparison not found")
+    endpoints = comp.endpoints_json or []
+    label_of = {ep["run_id"]: ep["label"] for ep in endpoints}
+    labels = [ep["label"] for ep in endpoints]
+
+    res = await session.execute(
+        select(Sample.run_id, Sample.test_id, CheckResult.type, CheckResult.passed, CheckResult.details_json)
+        .join(CheckResult, CheckResult.sample_id == Sample.id)
+        .where(Sample.run_id.in_(list(label_of)))
+    )
+    rows = res.all()
+
+    # label -> check type -> test_id -> passed (None for a fail-fast skip)
+    status = {label: defaultdict(dict) for label in labels}
+    counts = {label: defaultdict(lambda: {"passed": 0, "total": 0}) for label in labels}
+    for run_id, test_id, ctype, passed, details in rows:
+        label = label_of[run_id]
+        # Fail-fast skips are not comparable head-to-head and stay out of pass rates
+        if is_fail_fast_skip(details):
+            status[label][ctype][test_id] = None
+            continue
+        status[label][ctype][test_id] = passed
+        counts[label][ctype]["total"] += 1
+        if passed:
+            counts[label][ctype]["passed"] += 1
+
+    compacted = {
+        r.id: (r.totals_json or {}).get("aggregates", {})
+        for r in (await session.execute(select(Run).where(Run.id.in_(list(label_of))))).scalars()
+        if r.compacted_at
+    }
+
+    runs = []
+    for ep in endpoints:
+        if ep["run_id"] in compacted:
+            agg = compacted[ep["run_id"]]
+            runs.append({"label": ep["label"], "run_id": ep["run_id"], "compacted": True, **agg})
+            continue
+        by_check = counts[ep["label"]]
+        total = sum(v["total"] for v in by_check.values())
+        passed = sum(v["passed"] for v in by_check.values())
+        runs.append({
+            "label": ep["label"],
+            "run_id": ep["run_id"],
+            "pass_rate": passed / (total or 1),
+            "totals": {"checks": total, "passed": passed},
+            "by_check": {k: {"pass_rate": (v["passed"] / v["total"]) if v["total"] else 0.0, "total": v["total"]} for k, v in by_check.items()},
+        })
+
+    check_types = sorted({ctype for label in labels for ctype in status[label]})
+    win_loss: Dict[str, Any] = {}
+    for ctype in check_types:
+        table: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for a in labels:
+            table[a] = {}
+            for b in labels:
+                if a == b:
+                    continue
+                wins = losses = ties = not_comparable = 0
+                sa, sb = status[a][ctype], status[b][ctype]
+                for tid in sa.keys() & sb.keys():
+                    if sa[tid] is None or sb[tid] is None:
+                        not_comparable += 1
+                    elif sa[tid] and not sb[tid]:
+                        wins += 1
+                    elif sb[tid] and not sa[tid]:
+                        losses += 1
+                    else:
+                        ties += 1
+                table[a][b] = {"wins": wins, "losses": losses, "ties": ties, "not_comparable": not_comparable}
+        win_loss[ctype] = table
+
+    return {
+        "comparison_id": comparison_id,
+        "project_id": comp.project_id,
+        "status": comp.status,
+        "runs": runs,
+        "win_loss": win_loss,
+    }
@@ -4,14 +4,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from datetime import datetime
 
-from ..models import Project, Run, Sample, CheckResult
+from ..models import Project, Run, Sample, CheckResult, Comparison
 from .client import fetch_dataset, call_inference
-from ..checks.json_validity import check_json_validity
-from ..checks.regex_policy import check_regex_policy
-from ..checks.length_bounds import check_length_bounds
-from ..checks.pii import check_pii
-from ..checks.similarity import check_similarity
+from .lifecycle import intern_prompt, intern_reference
 from ..checks.base import CheckOutcome
+from ..checks.registry import run_checks_batch, skipped_outcome
 
 DEFAULT_THRESHOLDS: Dict[str, Any] = {
     "json": {"enabled": False, "schema": None},
@@ -20,8 +17,19 @@ DEFAULT_THRESHOLDS: Dict[str, Any] = {
     "pii": {"enabled": True},
     "similarity": {"enabled": False, "threshold": 0.82},
     "toxicity": {"enabled": False},  # stub only
+    "checks": {"order": "cost", "fail_fast": False},
 }
 
+# Number of samples scored together through the check pipeline
+CHECK_BATCH_SIZE = 32
+
+def resolve_thresholds(project: Project) -> Dict[str, Any]:
+    thresholds = DEFAULT_THRESHOLDS.copy()
+    if project.thresholds_json:
+        # shallow merge
+        thresholds.update(project.thresholds_json)
+    return thresholds
+
 async def execute_run(session_factory, run_id: str):
     # Create fresh session inside background task
     async with session_factory() as session:  # type: AsyncSession
@@ -37,10 +45,7 @@ async def execute_run(session_factory, run_id: str):
         run.started_at = datetime.utcnow()
         await session.commit()
 
-        thresholds = DEFAULT_THRESHOLDS.copy()
-        if project.thresholds_json:
-            # shallow merge
-            thresholds.update({**thresholds, **project.thresholds_json})
+        thresholds = resolve_thresholds(project)
 
         # Fetch dataset
         try:
@@ -57,66 +62,176 @@ async def execute_run(session_factory, run_id: str):
             await session.commit()
             return
 
-        # Iterate tests
+        # Iterate tests; checks run per chunk of CHECK_BATCH_SIZE samples
         total = 0
+        pending: List[tuple] = []
         for item in dataset:
-            test_id = str(item.get("id"))
-            prompt = item.get("prompt", "")
-            reference = item.get("reference")
-            metadata = item.get("metadata", {})
-
-            # Call inference
-            payload = {"id": test_id, "prompt": prompt, "metadata": metadata}
             try:
-                resp = await call_inference(
-                    project.inference_url,
-                    payload=payload,
-                    headers=project.headers_json or None,
-                    hmac_secret=project.hmac_secret,
-                )
+                resp = await _infer(project.inference_url, project.headers_json or None, project.hmac_secret, item)
             except Exception as e:
-                # Create sample with failure info
-                sample = Sample(
-                    run_id=run.id,
-                    test_id=test_id,
-                    prompt=prompt,
-                    output=f"__ERROR__: inference_failed: {e}",
-                    reference_json=reference,
-                    latency_ms=None,
-                    tokens=None,
-                )
-                session.add(sample)
-                await session.flush()
-                await _persist_checks_for_error(session, sample, str(e))
-                total += 1
-                continue
-
-            output = str(resp.get("output", ""))
-            latency_ms = resp.get("latency_ms")
-            tokens = resp.get("tokens")
-
-            sample = Sample(
-                run_id=run.id,
-                test_id=test_id,
-                prompt=prompt,
-                output=output,
-                reference_json=reference,
-                latency_ms=latency_ms,
-                tokens=tokens,
-            )
-            session.add(sample)
-            await session.flush()
-
-            # Run checks
-            await _run_checks(session, sample, output, reference, thresholds)
+                resp = e
+            checked = await _record_sample(session, run.id, item, resp)
+            if checked:
+                pending.append(checked)
+            if len(pending) >= CHECK_BATCH_SIZE:
+                await _run_checks(session, pending, thresholds)
+                pending = []
 
             total += 1
 
+        if pending:
+            await _run_checks(session, pending, thresholds)
+
         run.status = "done"
         run.finished_at = datetime.utcnow()
         run.totals_json = {"samples": total}
         await session.commit()
 
+def _fail_comparison(comp: Comparison, runs: List[Optional[Run]], error: Optional[str] = None):
+    comp.status = "failed"
+    comp.finished_at = datetime.utcnow()
+    for run in runs:
+        if run is None:
+            continue
+        run.status = "failed"
+        if error:
+            run.totals_json = {**(run.totals_json or {}), "error": error}
+
+async def execute_comparison(session_factory, comparison_id: str):
+    """Fetch the dataset once, fan every test case out to all endpoints concurrently
+    and score all outputs through one shared check pipeline."""
+    async with session_factory() as session:  # type: AsyncSession
+        comp = await session.get(Comparison, comparison_id)
+        if not comp:
+            return
+        project = await session.get(Project, comp.project_id)
+        endpoints = comp.endpoints_json or []
+        runs = [await session.get(Run, ep["run_id"]) for ep in endpoints]
+        if not project or not project.dataset_url or not endpoints:
+            _fail_comparison(comp, runs)
+            await session.commit()
+            return
+        if any(run is None for run in runs):
+            _fail_comparison(comp, runs, "missing_runs")
+            await session.commit()
+            return
+        now = datetime.utcnow()
+        comp.status = "running"
+        comp.started_at = now
+        for run in runs:
+            run.status = "running"
+            run.started_at = now
+        await session.commit()
+
+        try:
+            await _run_comparison(session, comp, project, endpoints, runs)
+        except Exception as e:
+            # Don't leave the comparison and its runs stranded at "running"
+            await session.rollback()
+            comp = await session.get(Comparison, comparison_id, populate_existing=True)
+            if comp is not None:
+                runs = [await session.get(Run, ep["run_id"], populate_existing=True) for ep in endpoints]
+                _fail_comparison(comp, runs, f"comparison_failed: {e}")
+                await session.commit()
+            raise
+
+async def _run_comparison(session: AsyncSession, comp: Comparison, project: Project, endpoints: List[Dict[str, Any]], runs: List[Run]):
+    thresholds = resolve_thresholds(project)
+
+    try:
+        dataset = await fetch_dataset(
+            project.dataset_url,
+            headers=project.headers_json or None,
+            limit=100,
+            offset=0,
+            tag=comp.tag,
+        )
+    except Exception as e:
+        _fail_comparison(comp, runs, f"dataset_fetch_failed: {e}")
+        await session.commit()
+        return
+
+    # One chunk holds every endpoint's output for the same test cases, so
+    # shared work (e.g. reference embeddings) is done once per test case.
+    pending: List[tuple] = []
+    for item in dataset:
+        resps = await asyncio.gather(
+            *(
+                _infer(
+                    ep["inference_url"],
+                    ep.get("headers") or project.headers_json or None,
+                    ep.get("hmac_secret") or project.hmac_secret,
+                    item,
+                )
+                for ep in endpoints
+            ),
+            return_exceptions=True,
+        )
+        for run, resp in zip(runs, resps):
+            checked = await _record_sample(session, run.id, item, resp)
+            if checked:
+                pending.append(checked)
+        if len(pending) >= CHECK_BATCH_SIZE:
+            await _run_checks(session, pending, thresholds)
+            pending = []
+
+    if pending:
+        await _run_checks(session, pending, thresholds)
+
+    now = datetime.utcnow()
+    for run in runs:
+        run.status = "done"
+        run.finished_at = now
+        run.totals_json = {"samples": len(dataset)}
+    comp.status = "done"
+    comp.finished_at = now
+    await session.commit()
+
+async def _infer(url: str, headers: Optional[Dict[str, str]], hmac_secret: Optional[str], item: Dict[str, Any]) -> Dict[str, Any]:
+    payload = {"id": str(item.get("id")), "prompt": item.get("prompt", ""), "metadata": item.get("metadata", {})}
+    return await call_inference(url, payload=payload, headers=headers, hmac_secret=hmac_secret)
+
+async def _record_sample(session: AsyncSession, run_id: str, item: Dict[str, Any], resp: Any) -> Optional[tuple]:
+    """Persist a sample for one inference response (or exception).
+
+    Returns the (sample, output, reference) triple still to be checked, or None
+    when inference failed and error checks were already written.
+    """
+    test_id = str(item.get("id"))
+    reference = item.get("reference")
+    # Prompts and references are stored once, by content hash
+    prompt_hash = await intern_prompt(session, item.get("prompt", ""))
+    reference_hash = await intern_reference(session, reference)
+
+    if isinstance(resp, BaseException):
+        # Create sample with failure info
+        sample = Sample(
+            run_id=run_id,
+            test_id=test_id,
+            prompt_hash=prompt_hash,
+            output=f"__ERROR__: inference_failed: {resp}",
+            reference_hash=reference_hash,
+            latency_ms=None,
+            tokens=None,
+        )
+        session.add(sample)
+        await session.flush()
+        await _persist_checks_for_error(session, sample, str(resp))
+        return None
+
+    output = str(resp.get("output", ""))
+    sample = Sample(
+        run_id=run_id,
+        test_id=test_id,
+        prompt_hash=prompt_hash,
+        output=output,
+        reference_hash=reference_hash,
+        latency_ms=resp.get("latency_ms"),
+        tokens=resp.get("tokens"),
+    )
+    session.add(sample)
+    return (sample, output, reference)
+
 async def _persist_checks_for_error(session: AsyncSession, sample: Sample, err: str):
     # Minimal checks: mark as failed for length and json validity
     outcomes = [
@@ -124,47 +239,16 @@ async def _persist_checks_for_error(session: AsyncSession, sample: Sample, err:
         CheckOutcome("json_validity", 0.0, False, {"error": err}),
     ]
     for oc in outcomes:
-        session.add(CheckResult(sample_id=sample.id, type=oc.type, score=oc.score, passed=oc.passed, details_json=oc.details))
+        session.add(CheckResult(sample_id=sample.id, run_id=sample.run_id, type=oc.type, score=oc.score, passed=oc.passed, details_json=oc.details))
     await session.flush()
 
-async def _run_checks(session: AsyncSession, sample: Sample, output: str, reference: Any, thresholds: Dict[str, Any]):
-    outcomes: List[CheckOutcome] = []
-
-    # length
-    lcfg = thresholds.get("length", {})
-    outcomes.append(check_length_bounds(output, min_chars=int(lcfg.get("min", 10)), max_chars=int(lcfg.get("max", 3000))))
-
-    # json
-    jcfg = thresholds.get("json", {})
-    if jcfg.get("enabled", False):
-        outcomes.append(check_json_validity(output, schema=jcfg.get("schema")))
-
-    # regex policy
-    rcfg = thresholds.get("regex", {})
-    outcomes.append(check_regex_policy(output, required=rcfg.get("required", []), forbidden=rcfg.get("forbidden", [])))
-
-    # pii
-    if thresholds.get("pii", {}).get("enabled", True):
-        outcomes.append(check_pii(output))
-
-    # similarity
-    scfg = thresholds.get("similarity", {})
-    if scfg.get("enabled", False):
-        ref_text = None
-        if isinstance(reference, dict):
-            ref_text = reference.get("reference_text")
-        elif isinstance(reference, str):
-            ref_text = reference
-        outcomes.append(await check_similarity(output, ref_text, threshold=float(scfg.get("threshold", 0.82))))
-
-    # (optional) toxicity stub - simple wordlist
-    if thresholds.get("toxicity", {}).get("enabled", False):
-        tox_words = ["idiot", "stupid", "hate"]
-        found = [w for w in tox_words if w in (output or "").lower()]
-        passed = len(found) == 0
-        outcomes.append(CheckOutcome("toxicity", 1.0 if passed else 0.0, passed, {"hits": found}))
-
-    for oc in outcomes:
-        session.add(CheckResult(sample_id=sample.id, type=oc.type, score=oc.score, passed=oc.passed, details_json=oc.details))
+async def _run_checks(session: AsyncSession, pending: List[tuple], thresholds: Dict[str, Any]):
+    # pending: (sample, output, reference) triples scored as one batch
+    await session.flush()
+    results = await run_checks_batch([o for _, o, _ in pending], [r for _, _, r in pending], thresholds)
+    for (sample, _, _), res in zip(pending, results):
+        # Fail-fast skips are recorded too, so diffs can tell "skipped" from "not configured"
+        for oc in res.outcomes + [skipped_outcome(name) for name in res.skipped]:
+            session.add(CheckResult(sample_id=sample.id, run_id=sample.run_id, type=oc.type, score=oc.score, passed=oc.passed, details_json=oc.details))
 
     await session.flush()
@@ -0,0 +1,73 @@
+"""Cold-start benchmark for the API process.
+
+Each sample runs in a fresh interpreter and measures:
+  - import_s: time to ``import app.main``
+  - first_request_s: process start -> startup hooks -> first response from GET /demo/tests
+  - heavy modules that ended up imported at boot (should stay empty)
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--out bench_output.txt]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only load on first use, not at boot
+HEAVY_MODULES = ["numpy", "jsonschema", "jinja2", "pgvector", "httpx"]
+
+CHILD = r"""
+import time
+t0 = time.perf_counter()
+import asyncio, json, sys
+import app.main
+t_import = time.perf_counter() - t0
+heavy = [m for m in %(heavy)r if m in sys.modules]
+
+async def first_request():
+    import httpx
+    await app.main.app.router.startup()
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.get("/demo/tests")
+        r.raise_for_status()
+
+asyncio.run(first_request())
+print(json.dumps({"import_s": t_import, "first_request_s": time.perf_counter() - t0, "heavy_at_boot": heavy}))
+"""
+
+def sample() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD % {"heavy": HEAVY_MODULES}],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--out", default=None, help="append the summary line to this file")
+    args = ap.parse_args()
+
+    samples = [sample() for _ in range(args.runs)]
+    summary = {
+        "bench": "startup",
+        "runs": args.runs,
+        "import_s_median": statistics.median(s["import_s"] for s in samples),
+        "first_request_s_median": statistics.median(s["first_request_s"] for s in samples),
+        "heavy_at_boot": samples[-1]["heavy_at_boot"],
+    }
+    line = json.dumps(summary)
+    print(line)
+    if args.out:
+        with open(args.out, "a") as f:
+            f.write(line + "\n")
+
+if __name__ == "__main__":
+    main()